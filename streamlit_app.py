@@ -1,19 +1,29 @@
 # app.py
 import os
 import io
-import json
 import time
 import shutil
 import hashlib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from datetime import datetime, timedelta, date
 from dateutil import tz
 from typing import Dict, List, Tuple, Optional, Set
 
 import bcrypt
 import duckdb
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as pa_ds
+import httplib2
 import streamlit as st
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
 from googleapiclient.errors import HttpError
@@ -66,7 +76,10 @@ st.set_page_config(page_title="Dial Speed Analyzer", page_icon="📞", layout="w
 ASIA_KOLKATA = tz.gettz("Asia/Kolkata")
 DATE_FMT_QUERY = "%Y-%m-%d"
 LOCAL_CACHE_DIR = "drive_cache"
+AGG_SUBDIR = "_agg"  # local-only per-date MIN() rollups derived from the raw partitions
+DRIVE_MAX_WORKERS = 12  # parallel Drive transfers; latency-bound, not CPU-bound
 DEFAULT_PERCENTILES = (95, 90, 85)
+DT_FMT = "%d-%m-%Y %H:%M:%S"  # timestamp format the dialer exports use
 UNRECOMMENDED_CAMPAIGNS = st.secrets.get(
     "unrecommended",
     [
@@ -171,12 +184,20 @@ def check_password(plain: str, hashed_bcrypt: str) -> bool:
     except Exception:
         return False
 
+# bcrypt is intentionally slow, so it must only ever run on an actual submit
+# (login_gate guards on `if submit:`). The users list itself is cheap-but-
+# repeated secrets parsing, so cache that across reruns.
+@st.cache_data(ttl=300, show_spinner=False)
 def get_auth_users() -> List[Dict]:
     auth = st.secrets.get("auth", {})
     users = auth.get("users", [])
     if isinstance(users, dict):
         users = [users]
-    return users
+    return [dict(u) for u in users]
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_users_by_hash() -> Dict[str, Dict]:
+    return {u.get("email_hash", ""): u for u in get_auth_users()}
 
 # -------------------------------------------------------------------
 # Login Gate (all fixes baked in)
@@ -295,6 +316,7 @@ def login_gate() -> Optional[Dict]:
     /* FORCE the submit button to be red & 3D no matter where Streamlit mounts it */
     .login-btn-wrap button,
     .stButton button,
+    button[kind="primaryFormSubmit"],
     button[data-testid="baseButton-primary"],
     button[data-testid="baseButton-secondary"]{
       width:100% !important; padding:14px 16px !important; border-radius:12px !important;
@@ -343,23 +365,9 @@ def login_gate() -> Optional[Dict]:
             submit = st.form_submit_button("Login", use_container_width=True, type="primary")
             st.markdown('</div>', unsafe_allow_html=True)
 
-        # tiny JS to tag the real "Login" button in case Streamlit remounts it
-        st.markdown("""
-        <script>
-        (function(){
-          function tagLogin(){
-            const btn = Array.from(document.querySelectorAll('button')).find(b => (b.innerText||'').trim()==='Login');
-            if(btn) btn.classList.add('force-red'); // class exists in global CSS targets above
-          }
-          tagLogin();
-          new MutationObserver(tagLogin).observe(document.body,{subtree:true, childList:true});
-        })();
-        </script>
-        """, unsafe_allow_html=True)
-
         if submit:
             email_hash = hash_email(email)
-            rec = next((u for u in users if u.get("email_hash") == email_hash), None)
+            rec = get_users_by_hash().get(email_hash)
             if rec and check_password(password, rec.get("password_bcrypt", "")):
                 st.session_state["auth_user"] = {
                     "name": rec.get("name", "User"),
@@ -389,17 +397,41 @@ st.markdown('<div class="main-content">', unsafe_allow_html=True)
 # -------------------------------------------------------------------
 # Drive helpers
 # -------------------------------------------------------------------
-@st.cache_resource(show_spinner="Connecting to Database Server...")
-def get_drive_service():
+@st.cache_resource(show_spinner=False)
+def get_drive_credentials():
     if "gcp_service_account" not in st.secrets:
         raise RuntimeError("Service account missing. Add [gcp_service_account] to secrets.")
     info = st.secrets["gcp_service_account"]
     if isinstance(info, str):
-        info = json.loads(info)
-    creds = service_account.Credentials.from_service_account_info(
+        info = orjson.loads(info)
+    return service_account.Credentials.from_service_account_info(
         info, scopes=["https://www.googleapis.com/auth/drive"]
     )
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
+
+@st.cache_resource(show_spinner="Connecting to Database Server...")
+def get_drive_service():
+    # static_discovery uses the bundled discovery doc instead of an HTTP
+    # fetch, shaving a network round-trip off cold start.
+    return build("drive", "v3", credentials=get_drive_credentials(), cache_discovery=False, static_discovery=True)
+
+_drive_tls = threading.local()
+
+def get_thread_drive():
+    """Drive client bound to the calling thread.
+
+    googleapiclient's default httplib2.Http is not thread-safe, so pooled
+    transfer workers each build a client over their own AuthorizedHttp;
+    without this the ThreadPoolExecutor serializes on one connection.
+    """
+    drive = getattr(_drive_tls, "drive", None)
+    if drive is None:
+        drive = build(
+            "drive", "v3",
+            http=AuthorizedHttp(get_drive_credentials(), http=httplib2.Http()),
+            cache_discovery=False, static_discovery=True,
+        )
+        _drive_tls.drive = drive
+    return drive
 
 def get_drive_folder_id() -> str:
     fid = st.secrets.get("drive_folder_id")
@@ -461,199 +493,517 @@ def delete_file_or_folder(drive, file_id: str):
         if e.resp.status != 404:
             raise e
 
-def ensure_partition_folder(drive, root_id: str, date_str: str) -> str:
+def delete_files_batch(drive, file_ids: List[str]):
+    """Delete many Drive files with batched HTTP requests.
+
+    Drive allows up to 100 metadata operations per batch, so this turns N
+    deletes into ceil(N/100) round-trips. Missing files (404) are ignored to
+    match delete_file_or_folder.
+    """
+    errors: List[Exception] = []
+
+    def _on_delete(request_id, response, exception):
+        if exception is None:
+            return
+        status = getattr(getattr(exception, "resp", None), "status", None)
+        if status != 404:
+            errors.append(exception)
+
+    for i in range(0, len(file_ids), 100):
+        batch = drive.new_batch_http_request(callback=_on_delete)
+        for fid in file_ids[i:i + 100]:
+            batch.add(drive.files().delete(fileId=fid, supportsAllDrives=True))
+        batch.execute()
+    if errors:
+        raise errors[0]
+
+def _download_job(file_id: str, local_path: str):
+    download_file(get_thread_drive(), file_id, local_path)
+
+def _upload_job(parent_id: str, local_path: str):
+    upload_file(get_thread_drive(), parent_id, local_path)
+
+def ensure_partition_folder(drive, root_id: str, date_str: str, folder_index: Optional[Dict[str, Dict]] = None) -> str:
     name = f"Date={date_str}"
+    if folder_index is not None:
+        found = folder_index.get(name)
+        if found:
+            return found["id"]
+        new_id = create_subfolder(drive, root_id, name)
+        folder_index[name] = {"id": new_id, "name": name}
+        return new_id
     found = find_child_by_name(drive, root_id, name)
     return found["id"] if found else create_subfolder(drive, root_id, name)
 
 def local_partition_dir(date_str: str) -> str:
     return os.path.join(LOCAL_CACHE_DIR, f"Date={date_str}")
 
+def local_agg_dir(date_str: str) -> str:
+    return os.path.join(LOCAL_CACHE_DIR, AGG_SUBDIR, f"Date={date_str}")
+
 def list_local_dates() -> Set[str]:
     if not os.path.isdir(LOCAL_CACHE_DIR):
         return set()
-    return {n.split("Date=")[-1] for n in os.listdir(LOCAL_CACHE_DIR) if n.startswith("Date=")}
+    with os.scandir(LOCAL_CACHE_DIR) as it:
+        return {e.name.split("Date=")[-1] for e in it if e.name.startswith("Date=") and e.is_dir()}
+
+# Short-TTL wrapper for the per-rerun sidebar check: tweaking a widget should
+# not rescan the cache directory. Import/delete clear it when partitions change.
+@st.cache_data(ttl=60, show_spinner=False)
+def _local_dates_cached() -> Set[str]:
+    return list_local_dates()
 
 def ensure_local_partitions_for_dates(drive, root_id: str, dates_needed: Set[str]):
     os.makedirs(LOCAL_CACHE_DIR, exist_ok=True)
     if not dates_needed:
         return
     folders_on_drive = {f["name"]: f for f in list_children(drive, root_id, "application/vnd.google-apps.folder")}
-    for ds in sorted(list(dates_needed)):
-        part_name, local_dir = f"Date={ds}", local_partition_dir(ds)
-        if os.path.isdir(local_dir) and os.listdir(local_dir):
-            continue
-        remote_folder = folders_on_drive.get(part_name)
-        if not remote_folder:
-            continue
-        files_to_download = [
-            f for f in list_children(drive, remote_folder["id"])
-            if f.get("mimeType") != "application/vnd.google-apps.folder"
-        ]
-        for f in files_to_download:
-            download_file(drive, f["id"], os.path.join(local_dir, f["name"]))
+    # Downloads are latency-bound on Drive round-trips, so fan them out.
+    jobs: Dict = {}
+    with ThreadPoolExecutor(max_workers=DRIVE_MAX_WORKERS) as ex:
+        for ds in sorted(list(dates_needed)):
+            part_name, local_dir = f"Date={ds}", local_partition_dir(ds)
+            if os.path.isdir(local_dir) and os.listdir(local_dir):
+                continue
+            remote_folder = folders_on_drive.get(part_name)
+            if not remote_folder:
+                continue
+            files_to_download = [
+                f for f in list_children(drive, remote_folder["id"])
+                if f.get("mimeType") != "application/vnd.google-apps.folder"
+            ]
+            for f in files_to_download:
+                fut = ex.submit(_download_job, f["id"], os.path.join(local_dir, f["name"]))
+                jobs[fut] = f["name"]
+        for fut in as_completed(jobs):
+            try:
+                fut.result()
+            except Exception as e:
+                st.warning(f"Could not download {jobs[fut]}: {e}")
 
 def upload_new_local_files(drive, root_id: str, dates_affected: Set[str]):
-    for ds in dates_affected:
-        part_dir = local_partition_dir(ds)
-        if not os.path.isdir(part_dir):
-            continue
-        dest_id = ensure_partition_folder(drive, root_id, ds)
-        for fname in os.listdir(part_dir):
-            fpath = os.path.join(part_dir, fname)
-            if os.path.isfile(fpath):
-                upload_file(drive, dest_id, fpath)
+    # One listing up front instead of a find_child_by_name round-trip per date.
+    folder_index = {f["name"]: f for f in list_children(drive, root_id, "application/vnd.google-apps.folder")}
+    jobs: Dict = {}
+    with ThreadPoolExecutor(max_workers=DRIVE_MAX_WORKERS) as ex:
+        for ds in dates_affected:
+            part_dir = local_partition_dir(ds)
+            if not os.path.isdir(part_dir):
+                continue
+            dest_id = ensure_partition_folder(drive, root_id, ds, folder_index)
+            with os.scandir(part_dir) as it:
+                for e in it:
+                    if e.is_file():
+                        jobs[ex.submit(_upload_job, dest_id, e.path)] = e.name
+        for fut in as_completed(jobs):
+            try:
+                fut.result()
+            except Exception as e:
+                st.warning(f"Could not upload {jobs[fut]}: {e}")
 
 def delete_dates_remote_and_local(drive, root_id: str, dates_to_delete: Set[str]):
     folders_on_drive = {f["name"]: f for f in list_children(drive, root_id, "application/vnd.google-apps.folder")}
+    child_ids: List[str] = []
+    folder_ids: List[str] = []
+    for ds in dates_to_delete:
+        if (remote_folder := folders_on_drive.get(f"Date={ds}")):
+            child_ids.extend(f["id"] for f in list_children(drive, remote_folder["id"]))
+            folder_ids.append(remote_folder["id"])
+    delete_files_batch(drive, child_ids)
+    delete_files_batch(drive, folder_ids)
     for ds in dates_to_delete:
-        part_name = f"Date={ds}"
-        if (remote_folder := folders_on_drive.get(part_name)):
-            for f in list_children(drive, remote_folder["id"]):
-                delete_file_or_folder(drive, f["id"])
-            delete_file_or_folder(drive, remote_folder["id"])
-        local_dir = local_partition_dir(ds)
-        if os.path.isdir(local_dir):
-            shutil.rmtree(local_dir, ignore_errors=True)
+        for local_dir in (local_partition_dir(ds), local_agg_dir(ds)):
+            if os.path.isdir(local_dir):
+                shutil.rmtree(local_dir, ignore_errors=True)
 
 # -------------------------------------------------------------------
 # Data manager + parsing
 # -------------------------------------------------------------------
+# Memoized so repeated queries render byte-identical SQL, which lets DuckDB's
+# prepared-statement cache reuse the parsed plan.
+@lru_cache(maxsize=16)
+def _cols_needed(group_by: Tuple[str, ...] = ()) -> str:
+    """Explicit projection list so parquet scans only read the columns we use."""
+    cols = {"Level1", "CAMPAIGN", "Date", "Dial Speed (seconds)", *group_by}
+    return ", ".join(f'"{c}"' for c in sorted(cols))
+
+@lru_cache(maxsize=16)
+def _quantile_list(pvals: Tuple[int, ...]) -> str:
+    """SQL list literal for QUANTILE_CONT so all percentiles share one sort."""
+    return "[" + ", ".join(str(p / 100.0) for p in pvals) + "]"
+
+@lru_cache(maxsize=16)
+def _quantile_cols(pvals: Tuple[int, ...]) -> str:
+    return ", ".join(f'ROUND(pcts[{i}])::INTEGER AS "P{p} DS"' for i, p in enumerate(pvals, start=1))
+
 class DataMgr:
     def __init__(self, base_path: str):
         self.base = os.path.abspath(base_path)
         os.makedirs(self.base, exist_ok=True)
-        self.con = duckdb.connect()
+        self.con = duckdb.connect(
+            config={"threads": str(os.cpu_count() or 4), "memory_limit": "4GB"}
+        )
+        # Keep parquet footers cached across queries; the writer produces many
+        # small files per date, so re-parsing them each query adds up.
+        self.con.execute("PRAGMA enable_object_cache;")
+        # Insertion-ordered so the oldest window can be evicted; each entry is
+        # a materialized TEMP TABLE and the connection is capped at 4GB.
+        self._window_tables: Dict[str, None] = {}
+        self._ensure_view()
 
     def _rp(self) -> str:
         return os.path.join(self.base, "*", "*.parquet")
 
-    def get_all_campaigns(self) -> List[str]:
+    def _agg_rp(self) -> str:
+        return os.path.join(self.base, AGG_SUBDIR, "*", "*.parquet")
+
+    def build_agg_for_dates(self, dates: Set[str]):
+        """(Re)build the per-date MIN rollup the dashboard queries read.
+
+        The expensive per-Level1 MIN over raw call rows runs once per ingest
+        here instead of inside every UI query. The rollup keeps the raw
+        column name so the query SQL is identical either way.
+        """
+        for ds in sorted(dates):
+            raw_glob = os.path.join(self.base, f"Date={ds}", "*.parquet")
+            out_dir = os.path.join(self.base, AGG_SUBDIR, f"Date={ds}")
+            os.makedirs(out_dir, exist_ok=True)
+            out_path = os.path.join(out_dir, "agg.parquet")
+            try:
+                self.con.execute(f"""
+                    COPY (
+                      SELECT "Interval", CAMPAIGN, "Level1",
+                             MIN("Dial Speed (seconds)") AS "Dial Speed (seconds)"
+                      FROM read_parquet('{raw_glob}')
+                      GROUP BY "Interval", CAMPAIGN, "Level1"
+                    ) TO '{out_path}' (FORMAT PARQUET);
+                """)
+            except Exception:
+                # Raw partition empty or unreadable; don't leave a stale rollup.
+                shutil.rmtree(out_dir, ignore_errors=True)
+
+    def ensure_agg(self):
+        """Build rollups for any raw partition that doesn't have one yet
+        (e.g. partitions freshly synced from Drive)."""
+        missing = set()
+        if os.path.isdir(self.base):
+            with os.scandir(self.base) as it:
+                for e in it:
+                    if not (e.name.startswith("Date=") and e.is_dir()):
+                        continue
+                    agg_path = os.path.join(self.base, AGG_SUBDIR, e.name, "agg.parquet")
+                    if not os.path.isfile(agg_path):
+                        missing.add(e.name.split("Date=")[-1])
+        if missing:
+            self.build_agg_for_dates(missing)
+
+    def _ensure_view(self) -> bool:
+        """(Re)create the session-wide view over the rollup partitions.
+
+        Fails (returns False) when no partitions exist yet; callers fall back
+        to their empty-result paths.
+        """
+        self.ensure_agg()
         try:
-            return (
-                self.con.execute(f"SELECT DISTINCT CAMPAIGN FROM read_parquet('{self._rp()}') ORDER BY 1;")
-                .df()["CAMPAIGN"].tolist()
+            self.con.execute(
+                f"CREATE OR REPLACE VIEW dial_data AS SELECT * FROM read_parquet('{self._agg_rp()}', hive_partitioning=1);"
             )
+            return True
         except Exception:
-            return []
+            return False
 
-    def get_summary(self, d1: str, d2: str, camps: Tuple[str, ...], group_by: List[str], pvals: Tuple[int, ...]) -> pd.DataFrame:
-        if not camps or not group_by:
-            return pd.DataFrame()
-        group_by_str = ", ".join([f'"{c}"' for c in group_by])
-        psel = ", ".join([f'ROUND(QUANTILE_CONT(min_dial_speed, {p/100.0}))::INTEGER AS "P{p} DS"' for p in pvals])
-        q = f"""
-        WITH MinSpeeds AS (
-          SELECT {group_by_str}, MIN("Dial Speed (seconds)") AS min_dial_speed
-          FROM read_parquet('{self._rp()}', hive_partitioning=1)
-          WHERE Date BETWEEN '{d1}' AND '{d2}' AND CAMPAIGN IN {camps}
-          GROUP BY {group_by_str}, "Level1"
-        )
-        SELECT {group_by_str},
-               COUNT(min_dial_speed)::INTEGER AS "Call Count",
-               ROUND(AVG(min_dial_speed))::INTEGER AS "Avg Dial Speed",
-               {psel}
-        FROM MinSpeeds
-        GROUP BY {group_by_str}
-        ORDER BY {group_by_str};
+    _MAX_WINDOW_TABLES = 4
+
+    def _window_table(self, d1: str, d2: str, camps: Tuple[str, ...]) -> Optional[str]:
+        """Materialize the filtered window once so the bundle queries share it.
+
+        Keeps at most _MAX_WINDOW_TABLES windows alive, dropping the least
+        recently used: a session scrubbing through date ranges or campaign
+        combinations would otherwise accumulate temp tables without bound.
         """
+        key = hashlib.sha256(repr((d1, d2, tuple(camps))).encode("utf-8")).hexdigest()[:12]
+        name = f"dial_window_{key}"
+        if name in self._window_tables:
+            # Re-insert to mark as most recently used.
+            self._window_tables[name] = self._window_tables.pop(name)
+            return name
+        if not self._ensure_view():
+            return None
         try:
-            return self.con.execute(q).df()
+            self.con.execute(
+                f"""CREATE TEMP TABLE {name} AS
+                    SELECT {_cols_needed(("Interval",))} FROM dial_data
+                    WHERE Date BETWEEN ? AND ? AND list_contains(?, CAMPAIGN);""",
+                [d1, d2, list(camps)],
+            )
         except Exception:
-            return pd.DataFrame()
+            return None
+        self._window_tables[name] = None
+        while len(self._window_tables) > self._MAX_WINDOW_TABLES:
+            oldest = next(iter(self._window_tables))
+            del self._window_tables[oldest]
+            try:
+                self.con.execute(f"DROP TABLE IF EXISTS {oldest};")
+            except Exception:
+                pass
+        return name
 
-    def get_weekly_summary(self, d1: str, d2: str, camps: Tuple[str, ...], pvals: Tuple[int, ...]) -> pd.DataFrame:
+    def invalidate_windows(self):
+        for name in self._window_tables:
+            try:
+                self.con.execute(f"DROP TABLE IF EXISTS {name};")
+            except Exception:
+                pass
+        self._window_tables.clear()
+        self._ensure_view()
+
+    def _fetch_df(self, q: str) -> pd.DataFrame:
+        # Arrow-backed frames keep string group keys in shared buffers instead
+        # of one Python object per cell; st.dataframe renders them natively.
+        return self.con.execute(q).fetch_arrow_table().to_pandas(types_mapper=pd.ArrowDtype)
+
+    # Streamlit reruns the whole script on every widget interaction, so the
+    # read paths are cached; `_self` is excluded from the cache key. Ingest and
+    # delete paths call clear_query_caches() to invalidate.
+    @st.cache_data(ttl=300, show_spinner=False)
+    def get_all_campaigns(_self) -> List[str]:
+        if not _self._ensure_view():
+            return []
+        try:
+            return _self._fetch_df(
+                "SELECT DISTINCT CAMPAIGN FROM dial_data ORDER BY 1;"
+            )["CAMPAIGN"].tolist()
+        except Exception:
+            return []
+
+    # The five Dashboard groupings only differ in grouping key, so one
+    # GROUPING SETS query computes all of them from a single scan of the
+    # window: stage one takes per-Level1 minimums for every grouping at once,
+    # stage two aggregates each grouping's rows, and the Python side splits
+    # the result by GROUPING_ID.
+    @st.cache_data(ttl=300, show_spinner=False)
+    def get_dashboard_bundle(_self, d1: str, d2: str, camps: Tuple[str, ...], pvals: Tuple[int, ...]):
+        empty = pd.DataFrame()
+        default_stats = {"Call Count": 0, "Avg Dial Speed": 0, **{f"P{p} DS": 0 for p in pvals}}
         if not camps:
-            return pd.DataFrame()
-        psel = ", ".join([f'ROUND(QUANTILE_CONT(min_dial_speed, {p/100.0}))::INTEGER AS "P{p} DS"' for p in pvals])
+            return empty, empty, empty, empty, empty, default_stats
+        window = _self._window_table(d1, d2, camps)
+        if window is None:
+            return empty, empty, empty, empty, empty, default_stats
         q = f"""
-        WITH MinSpeeds AS (
-          SELECT DATE_TRUNC('week', Date) AS week_start_date,
-                 CAMPAIGN,
+        WITH Mins AS (
+          SELECT Date, "Interval", CAMPAIGN,
+                 DATE_TRUNC('week', Date) AS week_start,
+                 GROUPING_ID(Date, "Interval", CAMPAIGN, DATE_TRUNC('week', Date)) AS gset,
                  MIN("Dial Speed (seconds)") AS min_dial_speed
-          FROM read_parquet('{self._rp()}', hive_partitioning=1)
-          WHERE Date BETWEEN '{d1}' AND '{d2}' AND CAMPAIGN IN {camps}
-          GROUP BY week_start_date, CAMPAIGN, "Level1"
+          FROM {window}
+          GROUP BY GROUPING SETS (
+            (CAMPAIGN, "Level1"),
+            (Date, "Level1"),
+            ("Interval", "Level1"),
+            (Date, "Interval", CAMPAIGN, "Level1"),
+            (DATE_TRUNC('week', Date), CAMPAIGN, "Level1"),
+            ("Level1")
+          )
+        ),
+        Agg AS (
+          SELECT gset, Date, "Interval", CAMPAIGN, week_start,
+                 COUNT(min_dial_speed)::INTEGER AS "Call Count",
+                 ROUND(AVG(min_dial_speed))::INTEGER AS "Avg Dial Speed",
+                 QUANTILE_CONT(min_dial_speed, {_quantile_list(pvals)}) AS pcts
+          FROM Mins
+          GROUP BY gset, Date, "Interval", CAMPAIGN, week_start
         )
-        SELECT week_start_date AS "Week Date",
-               CAMPAIGN,
-               COUNT(min_dial_speed)::INTEGER AS "Call Count",
-               ROUND(AVG(min_dial_speed))::INTEGER AS "Avg Dial Speed",
-               {psel}
-        FROM MinSpeeds
-        GROUP BY "Week Date", CAMPAIGN
-        ORDER BY "Week Date" DESC, CAMPAIGN;
+        SELECT gset, Date, "Interval", CAMPAIGN, week_start, "Call Count", "Avg Dial Speed", {_quantile_cols(pvals)}
+        FROM Agg;
         """
         try:
-            return self.con.execute(q).df()
+            res = _self._fetch_df(q)
         except Exception as e:
-            st.error(f"Error in weekly summary: {e}")
-            return pd.DataFrame()
-
-    def get_overall_stats(self, d1: str, d2: str, camps: Tuple[str, ...], pvals: Tuple[int, ...]) -> Dict[str, int]:
-        default_stats = {"Call Count": 0, "Avg Dial Speed": 0, **{f"P{p} DS": 0 for p in pvals}}
-        if not camps: return default_stats
-        psel = ", ".join([f'ROUND(QUANTILE_CONT(min_dial_speed, {p/100.0}))::INTEGER AS "P{p} DS"' for p in pvals])
-        q = f"""
-        WITH MinSpeeds AS (
-          SELECT MIN("Dial Speed (seconds)") AS min_dial_speed
-          FROM read_parquet('{self._rp()}', hive_partitioning=1)
-          WHERE Date BETWEEN '{d1}' AND '{d2}' AND CAMPAIGN IN {camps}
-          GROUP BY "Level1"
+            st.error(f"Error in dashboard aggregation: {e}")
+            return empty, empty, empty, empty, empty, default_stats
+
+        stat_cols = ["Call Count", "Avg Dial Speed"] + [f"P{p} DS" for p in pvals]
+        gid_cols = ["Date", "Interval", "CAMPAIGN", "week_start"]
+
+        def _gid(*grouped: str) -> int:
+            # GROUPING_ID sets a bit (MSB-first) for each key NOT in the set.
+            return sum(1 << (len(gid_cols) - 1 - i) for i, c in enumerate(gid_cols) if c not in grouped)
+
+        def _slice(grouped: List[str]) -> pd.DataFrame:
+            return res.loc[res["gset"] == _gid(*grouped), grouped + stat_cols].reset_index(drop=True)
+
+        by_camp = _slice(["CAMPAIGN"]).sort_values("CAMPAIGN").reset_index(drop=True)
+        by_date = _slice(["Date"]).sort_values("Date", ascending=False).reset_index(drop=True)
+        by_week = (
+            _slice(["week_start", "CAMPAIGN"])
+            .rename(columns={"week_start": "Week Date"})
+            .sort_values(["Week Date", "CAMPAIGN"], ascending=[False, True])
+            .reset_index(drop=True)
         )
-        SELECT COUNT(min_dial_speed)::INTEGER AS "Call Count",
-               ROUND(AVG(min_dial_speed))::INTEGER AS "Avg Dial Speed",
-               {psel}
-        FROM MinSpeeds;
-        """
-        try:
-            recs = self.con.execute(q).df().to_dict("records")
-            return recs[0] if recs else default_stats
-        except Exception:
-            return default_stats
+        by_interval = _slice(["Interval"]).sort_values("Interval").reset_index(drop=True)
+        dashboard = (
+            _slice(["Date", "Interval", "CAMPAIGN"])
+            .sort_values(["Date", "Interval"], ascending=[False, True])
+            .reset_index(drop=True)
+        )
+        overall = res.loc[res["gset"] == _gid(), stat_cols].to_dict("records")
+        stats = overall[0] if overall else default_stats
+        return by_camp, by_date, by_week, by_interval, dashboard, stats
 
     def write_partitioned_parquet(self, df: pd.DataFrame) -> Set[str]:
         if df.empty: return set()
-        df["Date"] = pd.to_datetime(df["Insert_Dt"], errors="coerce").dt.date
-        df.dropna(subset=["Date"], inplace=True)
-        touched = set()
-        for ds, g in df.groupby(df["Date"].astype(str)):
-            part_dir = local_partition_dir(ds)
-            os.makedirs(part_dir, exist_ok=True)
-            fname = f"import_{int(time.time())}_{len(os.listdir(part_dir)) + 1}.parquet"
-            g.to_parquet(os.path.join(part_dir, fname), index=False)
-            touched.add(str(ds))
+        df["Date"] = pd.to_datetime(df["Insert_Dt"], errors="coerce").dt.strftime("%Y-%m-%d")
+        df = df.dropna(subset=["Date"])
+        if df.empty: return set()
+        touched = set(df["Date"].unique())
+        # One columnar pass writes every Date= partition; no per-date groupby
+        # and no per-row string boxing.
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # ZSTD + dictionary pages: CAMPAIGN/CallStatus are low-cardinality and
+        # the timestamps near-monotonic, so this shrinks the files several-fold
+        # and every later DuckDB scan reads fewer bytes.
+        write_options = pa_ds.ParquetFileFormat().make_write_options(
+            compression="zstd",
+            compression_level=3,
+            use_dictionary=True,
+        )
+        pa_ds.write_dataset(
+            table,
+            base_dir=self.base,
+            format="parquet",
+            file_options=write_options,
+            max_rows_per_group=256_000,
+            partitioning=pa_ds.partitioning(pa.schema([("Date", pa.string())]), flavor="hive"),
+            existing_data_behavior="overwrite_or_ignore",
+            # uuid keeps concurrent or same-second imports from colliding:
+            # {i} only disambiguates files within a single write call, and
+            # overwrite_or_ignore would silently clobber an equal basename.
+            basename_template=f"import_{int(time.time())}_{uuid.uuid4().hex[:8]}_{{i}}.parquet",
+        )
+        self.build_agg_for_dates(touched)
+        clear_query_caches()
         return touched
 
 @st.cache_resource(show_spinner=False)
 def get_dm() -> "DataMgr":
     return DataMgr(LOCAL_CACHE_DIR)
 
+def clear_query_caches():
+    DataMgr.get_all_campaigns.clear()
+    DataMgr.get_dashboard_bundle.clear()
+    compute_all.clear()
+    _local_dates_cached.clear()
+    get_dm().invalidate_windows()
+
+# Persisted to disk so a restart or new session reuses recent bundles; the
+# ingest/delete paths clear it whenever the underlying partitions change.
+@st.cache_data(persist="disk", ttl="6h", max_entries=128, show_spinner=False)
+def compute_all(d1q, d2q, camps, pvals):
+    # One fused GROUPING SETS scan produces all five groupings plus the
+    # overall stats; frames come back pre-sorted.
+    return get_dm().get_dashboard_bundle(d1q, d2q, camps, pvals)
+
+REQUIRED_COLS = ["CAMPAIGNNAME", "Level1", "CallStartdate", "Insert_Dt", "attempt", "CallStatus"]
+
+def _csv_read_options() -> pa_csv.ReadOptions:
+    return pa_csv.ReadOptions(use_threads=True, block_size=64 << 20)
+
+def _csv_convert_options() -> pa_csv.ConvertOptions:
+    return pa_csv.ConvertOptions(
+        include_columns=REQUIRED_COLS,
+        column_types={"attempt": pa.int32()},
+    )
+
+def _parse_dt_unique(s: pd.Series) -> pd.Series:
+    """Parse datetimes through the unique strings and map back.
+
+    Call exports repeat timestamps heavily (many rows per second bucket), so
+    parsing each distinct string once is far cheaper than parsing per row.
+    """
+    uniq = pd.Index(s.unique())
+    # The fixed format hits pandas' C fast path; fall back to day-first
+    # inference only when a file deviates from the dialer's export format.
+    parsed = pd.to_datetime(uniq, format=DT_FMT, errors="coerce")
+    if parsed.isna().all() and len(uniq):
+        parsed = pd.to_datetime(uniq, dayfirst=True, errors="coerce")
+    return s.map(dict(zip(uniq, parsed)))
+
 def parse_and_filter_df(df: pd.DataFrame) -> pd.DataFrame:
-    req = ["CAMPAIGNNAME", "Level1", "CallStartdate", "Insert_Dt", "attempt", "CallStatus"]
-    miss = [c for c in req if c not in df.columns]
+    miss = [c for c in REQUIRED_COLS if c not in df.columns]
     if miss: raise ValueError("Missing required columns: " + ", ".join(miss))
 
-    df = df.copy()
-    df.dropna(subset=["Level1"], inplace=True)
-    df["Level1"] = df["Level1"].astype(str).str.strip()
-    df = df[df["Level1"] != ""]
+    # Build the column views once, combine into a single boolean mask and
+    # slice one time instead of filtering (and copying) in three stages.
+    lvl = df["Level1"].astype("string").str.strip()
+    attempt = pd.to_numeric(df["attempt"], errors="coerce").fillna(0).astype("int32")
+    status = df["CallStatus"].astype(str).str.strip().astype("category")
+    mask = (lvl.notna() & (lvl != "") & attempt.eq(1) & (status == "Connected")).fillna(False).to_numpy(dtype=bool)
+    df = df.loc[mask].reset_index(drop=True)
     if df.empty: return df
 
-    df["attempt"] = pd.to_numeric(df["attempt"], errors="coerce").fillna(0).astype(int)
-    df["CallStatus"] = df["CallStatus"].astype(str).str.strip()
-    df = df[(df["attempt"] == 1) & (df["CallStatus"] == "Connected")].copy()
-    if df.empty: return df
-
-    df.rename(columns={"CAMPAIGNNAME": "CAMPAIGN"}, inplace=True)
-    df["Dial Speed (seconds)"] = (
-        pd.to_datetime(df["CallStartdate"], dayfirst=True, errors="coerce")
-        - pd.to_datetime(df["Insert_Dt"], dayfirst=True, errors="coerce")
-    ).dt.total_seconds().abs()
-    df["Interval"] = pd.to_datetime(df["Insert_Dt"], errors="coerce").dt.hour
-    df["Insert_Dt"] = pd.to_datetime(df["Insert_Dt"], errors="coerce")
+    df["Level1"] = lvl.array[mask]
+    df["attempt"] = attempt.array[mask]
+    df["CallStatus"] = status.array[mask]
+
+    df = df.rename(columns={"CAMPAIGNNAME": "CAMPAIGN"})
+    # Low-cardinality key: a handful of campaigns across millions of rows.
+    # Level1 deliberately stays string — it is one phone number per row and a
+    # category there would cost more than it saves.
+    df["CAMPAIGN"] = df["CAMPAIGN"].astype("category")
+    ins = _parse_dt_unique(df["Insert_Dt"])
+    cs = _parse_dt_unique(df["CallStartdate"])
+    # Subtract on the int64 ns views: one pass to int32 seconds, no
+    # intermediate timedelta or float arrays. NaT is int64 min on both sides.
+    a = ins.to_numpy("datetime64[ns]").view("i8")
+    b = cs.to_numpy("datetime64[ns]").view("i8")
+    nat = np.iinfo("i8").min
+    secs = (np.abs(b - a) // 1_000_000_000).astype("int32")
+    df["Dial Speed (seconds)"] = pd.arrays.IntegerArray(secs, mask=(a == nat) | (b == nat))
+    # Hour straight off the same ns view: floor-divide to hours, mod 24.
+    hours = ((a // 3_600_000_000_000) % 24).astype("int8")
+    df["Interval"] = pd.arrays.IntegerArray(hours, mask=(a == nat))
+    df["Insert_Dt"] = ins
     return df
 
+def _read_and_filter(f) -> pd.DataFrame:
+    """Read one uploaded file and apply the standard filters.
+
+    Runs on worker threads during import; both the Arrow CSV parser and the
+    datetime work release the GIL, so files overlap well. CSVs stream in
+    ~64MB batches and only the filtered survivors are kept, so peak memory is
+    one batch plus the (much smaller) filtered rows rather than the whole
+    file. Excel has no streaming reader and stays single-shot.
+    """
+    if f.name.lower().endswith(".csv"):
+        parts = []
+        with pa_csv.open_csv(
+            f,
+            read_options=_csv_read_options(),
+            convert_options=_csv_convert_options(),
+        ) as reader:
+            for batch in reader:
+                part = parse_and_filter_df(pa.Table.from_batches([batch]).to_pandas(self_destruct=True))
+                if not part.empty:
+                    parts.append(part)
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    return parse_and_filter_df(pd.read_excel(f))
+
+class _NamedBuffer(io.BytesIO):
+    """BytesIO carrying the filename the readers key their format off."""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+# Keyed on the raw bytes: re-uploading (or retrying) the same file skips the
+# parse+filter work entirely. Streamlit hashes the bytes, not the frame.
+@st.cache_data(show_spinner=False, max_entries=32)
+def _filter_cached(file_bytes: bytes, ext: str) -> pd.DataFrame:
+    return _read_and_filter(_NamedBuffer(file_bytes, "upload" + ext))
+
 # -------------------------------------------------------------------
 # UI helpers
 # -------------------------------------------------------------------
@@ -663,22 +1013,24 @@ def today_ist() -> date:
 def first_of_month_ist(d: date) -> date:
     return d.replace(day=1)
 
+_STATIC_ICONS = (("Call Count", "📞"), ("Avg Dial Speed", "⏱️"))
+_PCT_ICONS = ("📈", "📊", "📉")
+_CARD_HTML = '<div class="metric-card mc-{i}"><div class="metric-title">{icon} {k}</div><div class="metric-value">{v}</div></div>'
+
 def render_cards(stats: Dict[str, int], percentiles: Tuple[int, ...]):
-    icons = {
-        "Call Count": "📞",
-        "Avg Dial Speed": "⏱️",
-        f"P{percentiles[0]} DS": "📈",
-        f"P{percentiles[1]} DS": "📊",
-        f"P{percentiles[2]} DS": "📉",
-    }
-    keys = ["Call Count", "Avg Dial Speed", f"P{percentiles[0]} DS", f"P{percentiles[1]} DS", f"P{percentiles[2]} DS"]
-    cols = st.columns(len(keys))
-    for i, k in enumerate(keys):
+    # Only the percentile labels are dynamic; the rest renders through one
+    # static template. Runs on every rerun, so keep it allocation-light.
+    pairs = list(_STATIC_ICONS) + [
+        (f"P{p} DS", _PCT_ICONS[j % len(_PCT_ICONS)]) for j, p in enumerate(percentiles)
+    ]
+    cols = st.columns(len(pairs))
+    for i, (k, icon) in enumerate(pairs):
         with cols[i]:
             v = stats.get(k, 0) or 0
-            cls = f"metric-card mc-{i % 5}"
-            html = f'<div class="{cls}"><div class="metric-title">{icons.get(k,"🔹")} {k}</div><div class="metric-value">{int(v)}</div></div>'
-            st.markdown(html, unsafe_allow_html=True)
+            st.markdown(
+                _CARD_HTML.format_map({"i": i % 5, "icon": icon, "k": k, "v": int(v)}),
+                unsafe_allow_html=True,
+            )
 
 # -------------------------------------------------------------------
 # Main after login
@@ -729,28 +1081,34 @@ with st.sidebar:
     d2_sel = st.date_input("To (IST)", value=d2, min_value=date(2000, 1, 1), max_value=t)
     d1, d2 = (d2_sel, d1_sel) if d1_sel > d2_sel else (d1_sel, d2_sel)
 
-    all_needed_dates = {d.strftime(DATE_FMT_QUERY) for d in pd.date_range(d1, d2, freq="D")}
-    missing_dates = all_needed_dates - list_local_dates()
+    all_needed_dates = {(d1 + timedelta(days=i)).strftime(DATE_FMT_QUERY) for i in range((d2 - d1).days + 1)}
+    missing_dates = all_needed_dates - _local_dates_cached()
     if missing_dates:
         with lottie_spinner(
                 text=f"Syncing {len(missing_dates)} date partition(s) from Database Server...",
                 height=150, loop=True, speed=1.05
         ):
             ensure_local_partitions_for_dates(drive, root_folder_id, missing_dates)
+        _local_dates_cached.clear()
 
     all_campaigns = dm.get_all_campaigns()
     if "selected_campaigns" not in st.session_state:
         st.session_state.selected_campaigns = [c for c in all_campaigns if c not in UNRECOMMENDED_CAMPAIGNS]
     st.write("**Campaigns**")
     c1, c2, c3 = st.columns(3)
+    # The buttons run before the multiselect, so writing its key here is
+    # picked up on this same pass — no explicit st.rerun and no second
+    # script execution per click.
     if c1.button("Recommended", use_container_width=True):
-        st.session_state.selected_campaigns = [c for c in all_campaigns if c not in UNRECOMMENDED_CAMPAIGNS]; st.rerun()
+        st.session_state.selected_campaigns = [c for c in all_campaigns if c not in UNRECOMMENDED_CAMPAIGNS]
     if c2.button("All", use_container_width=True):
-        st.session_state.selected_campaigns = list(all_campaigns); st.rerun()
+        st.session_state.selected_campaigns = list(all_campaigns)
     if c3.button("None", use_container_width=True):
-        st.session_state.selected_campaigns = []; st.rerun()
-    selected = st.multiselect("Selected Campaigns", options=all_campaigns, default=st.session_state.selected_campaigns, label_visibility="collapsed")
-    st.session_state.selected_campaigns = selected
+        st.session_state.selected_campaigns = []
+    # Drop selections whose campaign disappeared (e.g. dates deleted) before
+    # the widget validates its state against the current options.
+    st.session_state.selected_campaigns = [c for c in st.session_state.selected_campaigns if c in all_campaigns]
+    st.multiselect("Selected Campaigns", options=all_campaigns, key="selected_campaigns", label_visibility="collapsed")
 
     st.divider()
     st.header("⚙️ Settings")
@@ -785,25 +1143,11 @@ if selected_tab == "Dashboard":
     else:
         d1q, d2q = d1.strftime(DATE_FMT_QUERY), d2.strftime(DATE_FMT_QUERY)
 
-        @st.cache_data(show_spinner=False)
-        def compute_all(d1q, d2q, camps, pvals):
-            summary_by_camp = dm.get_summary(d1q, d2q, camps, ["CAMPAIGN"], pvals)
-            summary_by_date = dm.get_summary(d1q, d2q, camps, ["Date"], pvals)
-            weekly_summary = dm.get_weekly_summary(d1q, d2q, camps, pvals)
-            by_interval = dm.get_summary(d1q, d2q, camps, ["Interval"], pvals)
-            dashboard = dm.get_summary(d1q, d2q, camps, ["Date", "Interval", "CAMPAIGN"], pvals)
-
-            if not summary_by_date.empty: summary_by_date.sort_values(by="Date", ascending=False, inplace=True)
-            if not by_interval.empty: by_interval.sort_values(by="Interval", ascending=True, inplace=True)
-            if not dashboard.empty: dashboard.sort_values(by=["Date", "Interval"], ascending=[False, True], inplace=True)
-
-            stats = dm.get_overall_stats(d1q, d2q, camps, pvals)
-            return summary_by_camp, summary_by_date, weekly_summary, by_interval, dashboard, stats
-
-
         with lottie_spinner(text="Running analytics...", height=140, loop=True, speed=1.1):
+            # Sorted so the cache key is order-independent: reselecting the
+            # same campaigns in a different order hits the cached bundle.
             by_camp, by_date, by_week, by_interval, dashboard, stats = compute_all(
-                d1q, d2q, tuple(st.session_state.selected_campaigns), percentiles
+                d1q, d2q, tuple(sorted(st.session_state.selected_campaigns)), percentiles
             )
 
         render_cards(stats, percentiles)
@@ -812,17 +1156,24 @@ if selected_tab == "Dashboard":
         tabs = st.tabs(["Overall Dashboard", "By Campaign", "By Date", "Weekly View", "By Interval"])
         date_column_config = st.column_config.DatetimeColumn("Date", format="DD-MMM-YY")
         week_date_column_config = st.column_config.DatetimeColumn("Week Date", format="DD-MMM-YY")
+        # The stat columns come back as int32 from DuckDB; a plain %d config
+        # lets the grid render them pass-through instead of per-cell number
+        # formatting in the browser.
+        num_config = {
+            c: st.column_config.NumberColumn(format="%d")
+            for c in ("Interval", "Call Count", "Avg Dial Speed", *(f"P{p} DS" for p in percentiles))
+        }
 
         with tabs[0]:
-            st.dataframe(dashboard, use_container_width=True, hide_index=True, column_config={"Date": date_column_config})
+            st.dataframe(dashboard, use_container_width=True, hide_index=True, column_config={**num_config, "Date": date_column_config})
         with tabs[1]:
-            st.dataframe(by_camp, use_container_width=True, hide_index=True)
+            st.dataframe(by_camp, use_container_width=True, hide_index=True, column_config=num_config)
         with tabs[2]:
-            st.dataframe(by_date, use_container_width=True, hide_index=True, column_config={"Date": date_column_config})
+            st.dataframe(by_date, use_container_width=True, hide_index=True, column_config={**num_config, "Date": date_column_config})
         with tabs[3]:
-            st.dataframe(by_week, use_container_width=True, hide_index=True, column_config={"Week Date": week_date_column_config})
+            st.dataframe(by_week, use_container_width=True, hide_index=True, column_config={**num_config, "Week Date": week_date_column_config})
         with tabs[4]:
-            st.dataframe(by_interval, use_container_width=True, hide_index=True)
+            st.dataframe(by_interval, use_container_width=True, hide_index=True, column_config=num_config)
 
 elif selected_tab == "Import Data":
     if not IS_ADMIN: st.stop()
@@ -833,22 +1184,29 @@ elif selected_tab == "Import Data":
     if st.button("Process & Import Files", type="primary", disabled=(not uploaded_files), use_container_width=True):
         total_rows, dfs = 0, []
         progress_bar = st.progress(0, "Starting import...")
-        for i, f in enumerate(uploaded_files):
-            try:
-                progress_bar.progress((i + 1) / len(uploaded_files), f"Processing {f.name}...")
-                df = pd.read_csv(f) if f.name.lower().endswith(".csv") else pd.read_excel(f)
-                df_filtered = parse_and_filter_df(df)
-                if not df_filtered.empty:
-                    total_rows += len(df_filtered)
-                    dfs.append(df_filtered)
-            except Exception as e:
-                st.warning(f"Could not process {f.name}: {e}")
+        done = 0
+        with ThreadPoolExecutor(max_workers=min(8, len(uploaded_files))) as ex:
+            jobs = {
+                ex.submit(_filter_cached, f.getvalue(), os.path.splitext(f.name)[1].lower()): f.name
+                for f in uploaded_files
+            }
+            for fut in as_completed(jobs):
+                fname = jobs[fut]
+                done += 1
+                progress_bar.progress(done / len(uploaded_files), f"Processed {fname}...")
+                try:
+                    df_filtered = fut.result()
+                    if not df_filtered.empty:
+                        total_rows += len(df_filtered)
+                        dfs.append(df_filtered)
+                except Exception as e:
+                    st.warning(f"Could not process {fname}: {e}")
 
         progress_bar.progress(1.0, "Finalizing...")
         if not dfs:
             st.warning("No valid data found to import after filtering.")
         else:
-            merged = pd.concat(dfs, ignore_index=True)
+            merged = dfs[0] if len(dfs) == 1 else pd.concat(dfs, ignore_index=True)
             touched = dm.write_partitioned_parquet(merged)
             try:
                 with lottie_spinner(
@@ -862,8 +1220,6 @@ elif selected_tab == "Import Data":
                 # celebratory animation instead of balloons
                 dotlottie_player(DOTLOTTIE_SUCCESS_URL, height=180, loop=False, speed=1.0)
 
-                compute_all.clear()
-
             except Exception as e:
                 st.error(f"Data was imported locally, but the upload to Database failed: {e}")
         progress_bar.empty()
@@ -890,6 +1246,7 @@ elif selected_tab == "Manage Data":
                 ):
                     delete_dates_remote_and_local(drive, root_folder_id, set(sel_dates))
 
+                clear_query_caches()
                 st.success(f"Successfully deleted {len(sel_dates)} date partition(s).")
                 dotlottie_player(DOTLOTTIE_SUCCESS_URL, height=160, loop=False)
 